@@ -9,13 +9,50 @@ import json
 import hashlib
 import subprocess
 import logging
+import multiprocessing
+import platform
+import queue
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import mimetypes
 
 from PIL import Image
-import piexif
+
+# Optional: libvips streams tiles and uses SIMD libjpeg-turbo/libwebp,
+# typically 2-4x faster than Pillow on thumbnail pipelines
+try:
+    import pyvips
+except ImportError:
+    pyvips = None
+
+# Optional: PyAV binds libavformat in-process so probing needs no
+# subprocess spawn at all (the dominant per-file metadata cost)
+try:
+    import av
+except ImportError:
+    av = None
+
+# Optional: orjson serializes records 2-10x faster than stdlib json and
+# emits bytes directly for the buffered writer
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: NVJPEG decode + GPU resize for JPEG thumbnails when CUDA exists
+try:
+    import torch
+    from torchvision.io import ImageReadMode, decode_jpeg, read_file
+    from torchvision.transforms import v2 as tv_transforms
+    CUDA_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    torch = None
+    CUDA_AVAILABLE = False
 
 # Setup logging
 logging.basicConfig(
@@ -31,75 +68,230 @@ THUMBNAILS_DIR = OUTPUT_DIR / "public" / "thumbnails"
 OUTPUT_JSON = OUTPUT_DIR / "public" / "media_index.json"
 THUMBNAIL_WIDTH = 800
 VIDEO_FRAME_COUNT = 5
+MAX_WORKERS = os.cpu_count() or 4
+
+# WebP encoder tuning: method=0 encodes ~4x faster than the default
+# method=4 at a slight size cost; override via env when size matters more
+THUMBNAIL_QUALITY = int(os.environ.get('THUMBNAIL_QUALITY', '80'))
+THUMBNAIL_WEBP_METHOD = int(os.environ.get('THUMBNAIL_WEBP_METHOD', '0'))
 
 # Supported file extensions
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp', '.heic', '.heif'}
 VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.m4v', '.wmv', '.flv', '.webm', '.mpeg', '.mpg', '.3gp'}
 AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma', '.opus'}
 
+# Flat extension -> type lookup, built once at import
+EXT_TO_TYPE = {ext: media_type
+               for media_type, extensions in [('image', IMAGE_EXTENSIONS),
+                                              ('video', VIDEO_EXTENSIONS),
+                                              ('audio', AUDIO_EXTENSIONS)]
+               for ext in extensions}
+
 # System folders to skip
 SKIP_FOLDERS = {'.Trash', '.Spotlight-V100', '.fseventsd', '.DocumentRevisions-V100',
                 '.TemporaryItems', '.VolumeIcon.icns', 'System Volume Information', '$RECYCLE.BIN'}
 
 
-def should_skip_path(path: Path) -> bool:
-    """Check if a path should be skipped."""
-    parts = path.parts
-    for part in parts:
-        if part.startswith('.') and part in SKIP_FOLDERS:
-            return True
-        if part.startswith('.') and len(part) > 1:
-            # Skip hidden folders except .thumbnails
-            if part != '.thumbnails':
-                return True
-    return False
+def should_skip_dir(name: str) -> bool:
+    """Check if a directory should be pruned from the walk."""
+    if name in SKIP_FOLDERS:
+        return True
+    # Skip hidden folders except .thumbnails
+    return name.startswith('.') and len(name) > 1 and name != '.thumbnails'
+
+
+def walk_parallel(root: Path, n_threads: int = 8):
+    """Walk a directory tree with a pool of os.scandir threads.
+
+    os.scandir returns DirEntry objects with stat info cached, avoiding the
+    per-entry stat calls pathlib's rglob pays. Directories are fanned out to
+    worker threads through a shared queue and system/hidden folders are
+    pruned at traversal time; file entries are yielded as they are found.
+    """
+    dir_queue: queue.Queue = queue.Queue()
+    file_queue: queue.Queue = queue.Queue()
+    dir_queue.put(str(root))
+
+    def worker():
+        while True:
+            dir_path = dir_queue.get()
+            if dir_path is None:
+                break
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not should_skip_dir(entry.name):
+                                    dir_queue.put(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                # Hidden files (.DS_Store, ._* AppleDouble)
+                                if not entry.name.startswith('.'):
+                                    file_queue.put(entry)
+                        except OSError:
+                            continue
+            except OSError as e:
+                logging.warning(f"Could not scan {dir_path}: {e}")
+            finally:
+                dir_queue.task_done()
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(n_threads)]
+    for w in workers:
+        w.start()
+
+    def closer():
+        dir_queue.join()
+        file_queue.put(None)
+        for _ in workers:
+            dir_queue.put(None)
+
+    threading.Thread(target=closer, daemon=True).start()
+
+    while True:
+        entry = file_queue.get()
+        if entry is None:
+            break
+        yield entry
+
+    for w in workers:
+        w.join()
+
+
+def advise_willneed(file_path: Path):
+    """Ask the kernel to prefetch a file into the page cache (Linux only).
+
+    POSIX_FADV_WILLNEED starts readahead for the whole file, so whoever
+    reads it next (Pillow or ffmpeg on its own fd) finds the pages warm.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
 
 
 def get_file_type(file_path: Path) -> Optional[str]:
     """Determine if file is image, video, or audio."""
-    ext = file_path.suffix.lower()
-    if ext in IMAGE_EXTENSIONS:
-        return 'image'
-    elif ext in VIDEO_EXTENSIONS:
-        return 'video'
-    elif ext in AUDIO_EXTENSIONS:
-        return 'audio'
-    return None
-
-
-def get_creation_date(file_path: Path, file_type: str) -> str:
-    """Extract creation date from file metadata."""
+    return EXT_TO_TYPE.get(file_path.suffix.lower())
+
+
+# ffprobe results cached per process, keyed by path
+_PROBE_CACHE: Dict[str, Dict] = {}
+
+# Shared across pool workers (set by _init_worker) to cap the number of
+# concurrent ffmpeg/ffprobe processes at MAX_WORKERS; None means unthrottled
+_SUBPROCESS_SEMAPHORE = None
+
+
+def run_media_subprocess(cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
+    """Run an ffmpeg/ffprobe command under the shared concurrency cap.
+
+    Without the cap, file-level workers multiplied by ffmpeg's internal
+    threading can spawn far more runnable threads than cores and thrash;
+    each tool is also passed -threads 1 by its caller so workers * threads
+    stays at cpu_count.
+    """
+    if _SUBPROCESS_SEMAPHORE is None:
+        return subprocess.run(cmd, **kwargs)
+    with _SUBPROCESS_SEMAPHORE:
+        return subprocess.run(cmd, **kwargs)
+
+
+def _probe_with_pyav(file_path: Path) -> Optional[Dict]:
+    """Probe a file in-process with PyAV, shaped like ffprobe's JSON.
+
+    Opening the container via libavformat costs no subprocess spawn,
+    which is the dominant per-file metadata cost ffprobe pays.
+    """
     try:
-        # Try EXIF for images
-        if file_type == 'image':
-            try:
-                exif_dict = piexif.load(str(file_path))
-                if piexif.ExifIFD.DateTimeOriginal in exif_dict.get('Exif', {}):
-                    date_str = exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal].decode()
-                    dt = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
-                    return dt.isoformat() + 'Z'
-            except:
-                pass
+        with av.open(str(file_path), metadata_errors='ignore') as container:
+            streams = []
+            for stream in container.streams:
+                info = {'codec_type': stream.type}
+                if stream.type == 'video':
+                    info['width'] = stream.codec_context.width
+                    info['height'] = stream.codec_context.height
+                if stream.duration is not None and stream.time_base is not None:
+                    info['duration'] = str(float(stream.duration * stream.time_base))
+                streams.append(info)
+
+            fmt = {}
+            if container.duration is not None:
+                fmt['duration'] = str(container.duration / av.time_base)
+            creation_time = container.metadata.get('creation_time')
+            if creation_time:
+                fmt['tags'] = {'creation_time': creation_time}
+
+            return {'streams': streams, 'format': fmt}
+    except Exception as e:
+        logging.debug(f"PyAV probe failed for {file_path.name}, using ffprobe: {e}")
+        return None
+
 
+def probe_media(file_path: Path) -> Dict:
+    """Probe a file once and cache the parsed result.
+
+    PyAV (when installed) reads the container in-process; otherwise a
+    single ffprobe invocation fetches stream dimensions, durations and
+    the creation_time tag, so metadata and creation-date lookups don't
+    each pay the subprocess spawn cost. -threads 1 keeps the probe from
+    grabbing cores needed by parallel file workers.
+    """
+    key = str(file_path)
+    if key in _PROBE_CACHE:
+        return _PROBE_CACHE[key]
+
+    if av is not None:
+        data = _probe_with_pyav(file_path)
+        if data is not None:
+            _PROBE_CACHE[key] = data
+            return data
+
+    data = {}
+    try:
+        result = run_media_subprocess([
+            'ffprobe', '-v', 'quiet', '-threads', '1', '-print_format', 'json',
+            '-show_entries',
+            'stream=codec_type,width,height,duration:format=duration:format_tags=creation_time',
+            str(file_path)
+        ], capture_output=True, text=True, timeout=30)
+
+        if result.returncode == 0:
+            data = json.loads(result.stdout)
+    except Exception as e:
+        logging.error(f"Error probing {file_path.name}: {e}")
+
+    _PROBE_CACHE[key] = data
+    return data
+
+
+def get_creation_date(file_path: Path, file_type: str,
+                      stat: Optional[os.stat_result] = None) -> str:
+    """Extract creation date from file metadata.
+
+    Accepts an already-fetched stat result so callers that have one
+    (process_file stats every file for its size) don't pay the syscall twice.
+    Image EXIF dates are handled in get_image_metadata from the open handle.
+    """
+    try:
         # Try ffprobe for videos/audio
         if file_type in ['video', 'audio']:
             try:
-                result = subprocess.run([
-                    'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                    '-show_entries', 'format_tags=creation_time',
-                    str(file_path)
-                ], capture_output=True, text=True, timeout=10)
-
-                if result.returncode == 0:
-                    data = json.loads(result.stdout)
-                    creation_time = data.get('format', {}).get('tags', {}).get('creation_time')
-                    if creation_time:
-                        return creation_time
+                data = probe_media(file_path)
+                creation_time = data.get('format', {}).get('tags', {}).get('creation_time')
+                if creation_time:
+                    return creation_time
             except:
                 pass
 
         # Fallback to file system creation time
-        stat = file_path.stat()
+        if stat is None:
+            stat = file_path.stat()
         birthtime = getattr(stat, 'st_birthtime', None) or stat.st_mtime
         return datetime.fromtimestamp(birthtime).isoformat() + 'Z'
 
@@ -109,36 +301,48 @@ def get_creation_date(file_path: Path, file_type: str) -> str:
 
 
 def get_image_metadata(file_path: Path) -> Dict:
-    """Extract metadata from image file."""
+    """Extract metadata (and EXIF creation date) from image file.
+
+    The creation date is read from the same open image handle, so images
+    aren't opened a second time just for EXIF.
+    """
     try:
         with Image.open(file_path) as img:
             width, height = img.size
+
+            # DateTimeOriginal lives in the Exif IFD; fall back to DateTime
+            creation_date = None
+            try:
+                exif = img.getexif()
+                date_str = exif.get_ifd(0x8769).get(36867) or exif.get(306)
+                if date_str:
+                    dt = datetime.strptime(str(date_str), '%Y:%m:%d %H:%M:%S')
+                    creation_date = dt.isoformat() + 'Z'
+            except Exception:
+                pass
+
             return {
                 'resolution': {'width': width, 'height': height},
                 'duration': None,
-                'format': img.format.lower() if img.format else file_path.suffix[1:].lower()
+                'format': img.format.lower() if img.format else file_path.suffix[1:].lower(),
+                'creationDate': creation_date
             }
     except Exception as e:
         logging.error(f"Error reading image metadata for {file_path.name}: {e}")
         return {
             'resolution': {'width': 0, 'height': 0},
             'duration': None,
-            'format': file_path.suffix[1:].lower()
+            'format': file_path.suffix[1:].lower(),
+            'creationDate': None
         }
 
 
 def get_video_metadata(file_path: Path) -> Dict:
     """Extract metadata from video file using ffprobe."""
     try:
-        result = subprocess.run([
-            'ffprobe', '-v', 'quiet', '-print_format', 'json',
-            '-show_entries', 'stream=width,height,duration:format=duration',
-            str(file_path)
-        ], capture_output=True, text=True, timeout=30)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
+        data = probe_media(file_path)
 
+        if data:
             # Get video stream info
             video_stream = next((s for s in data.get('streams', []) if s.get('width')), None)
 
@@ -170,14 +374,9 @@ def get_video_metadata(file_path: Path) -> Dict:
 def get_audio_metadata(file_path: Path) -> Dict:
     """Extract metadata from audio file using ffprobe."""
     try:
-        result = subprocess.run([
-            'ffprobe', '-v', 'quiet', '-print_format', 'json',
-            '-show_entries', 'format=duration',
-            str(file_path)
-        ], capture_output=True, text=True, timeout=30)
+        data = probe_media(file_path)
 
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
+        if data:
             duration = None
             if 'format' in data and 'duration' in data['format']:
                 duration = float(data['format']['duration'])
@@ -197,12 +396,61 @@ def get_audio_metadata(file_path: Path) -> Dict:
     }
 
 
+def _generate_jpeg_thumbnail_gpu(file_path: Path, output_path: Path) -> bool:
+    """Decode and resize a JPEG on the GPU (NVJPEG), then encode to WebP."""
+    try:
+        tensor = decode_jpeg(read_file(str(file_path)), mode=ImageReadMode.RGB,
+                             device='cuda')
+        if tensor.shape[2] > THUMBNAIL_WIDTH:
+            new_height = max(1, round(tensor.shape[1] * THUMBNAIL_WIDTH / tensor.shape[2]))
+            tensor = tv_transforms.Resize(
+                (new_height, THUMBNAIL_WIDTH),
+                interpolation=tv_transforms.InterpolationMode.BICUBIC,
+                antialias=True
+            )(tensor)
+        arr = tensor.permute(1, 2, 0).cpu().numpy()
+        Image.fromarray(arr).save(output_path, 'WEBP', quality=THUMBNAIL_QUALITY,
+                                  method=THUMBNAIL_WEBP_METHOD)
+        return True
+    except Exception as e:
+        logging.debug(f"GPU thumbnail failed for {file_path.name}, using CPU: {e}")
+        return False
+
+
 def generate_image_thumbnail(file_path: Path, output_path: Path) -> bool:
     """Generate thumbnail for image file."""
     try:
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # CUDA fast path: NVJPEG decode and GPU resize for JPEGs
+        if CUDA_AVAILABLE and file_path.suffix.lower() in ('.jpg', '.jpeg'):
+            if _generate_jpeg_thumbnail_gpu(file_path, output_path):
+                return True
+
+        # libvips fast path: thumbnail() shrinks on load for JPEG/WebP/HEIF
+        # and does the final pass with LANCZOS internally
+        if pyvips is not None:
+            try:
+                thumb = pyvips.Image.thumbnail(
+                    str(file_path), THUMBNAIL_WIDTH,
+                    height=10 ** 6, size='down', no_rotate=False
+                )
+                if thumb.hasalpha():
+                    thumb = thumb.flatten(background=[255, 255, 255])
+                thumb.write_to_file(str(output_path), Q=THUMBNAIL_QUALITY)
+                return True
+            except Exception as e:
+                logging.debug(f"pyvips failed for {file_path.name}, using Pillow: {e}")
+
         with Image.open(file_path) as img:
+            # JPEG fast path: draft() lets libjpeg DCT-downscale by 2/4/8
+            # during decode, so large camera files never decode at full
+            # resolution (a no-op for other formats)
+            width, height = img.size
+            if width > THUMBNAIL_WIDTH:
+                draft_height = max(1, int(height * THUMBNAIL_WIDTH / width))
+                img.draft('RGB', (THUMBNAIL_WIDTH, draft_height))
+
             # Convert RGBA to RGB if necessary
             if img.mode in ('RGBA', 'LA', 'P'):
                 background = Image.new('RGB', img.size, (255, 255, 255))
@@ -213,14 +461,15 @@ def generate_image_thumbnail(file_path: Path, output_path: Path) -> bool:
             elif img.mode != 'RGB':
                 img = img.convert('RGB')
 
-            # Calculate new dimensions
-            width, height = img.size
-            if width > THUMBNAIL_WIDTH:
-                new_height = int(height * THUMBNAIL_WIDTH / width)
-                img = img.resize((THUMBNAIL_WIDTH, new_height), Image.Resampling.LANCZOS)
+            # Downscale to target width; thumbnail() runs a cheap box-filter
+            # reduction pass before the final LANCZOS step (reducing_gap)
+            if img.size[0] > THUMBNAIL_WIDTH:
+                img.thumbnail((THUMBNAIL_WIDTH, 10 ** 6),
+                              Image.Resampling.LANCZOS, reducing_gap=2.0)
 
             # Save as WebP
-            img.save(output_path, 'WEBP', quality=85)
+            img.save(output_path, 'WEBP', quality=THUMBNAIL_QUALITY,
+                     method=THUMBNAIL_WEBP_METHOD)
             return True
 
     except Exception as e:
@@ -228,40 +477,86 @@ def generate_image_thumbnail(file_path: Path, output_path: Path) -> bool:
         return False
 
 
-def generate_video_thumbnails(file_path: Path, output_dir: Path, duration: Optional[float]) -> Tuple[Optional[str], List[str]]:
-    """Generate 5 thumbnails distributed across video duration."""
+@lru_cache(maxsize=1)
+def hwaccel_args() -> Tuple[str, ...]:
+    """Pick ffmpeg hardware-decode flags for this host, if any.
+
+    ffmpeg falls back to software decode on its own if the accelerator
+    can't handle a given codec, so these flags are safe to pass always.
+    """
+    system = platform.system()
+    if system == 'Darwin':
+        return ('-hwaccel', 'videotoolbox', '-hwaccel_output_format', 'nv12')
+    if system == 'Linux':
+        if shutil.which('nvidia-smi'):
+            return ('-hwaccel', 'cuda', '-hwaccel_output_format', 'nv12')
+        if os.path.exists('/dev/dri/renderD128'):
+            return ('-hwaccel', 'vaapi')
+    return ()
+
+
+def generate_video_artifacts(file_path: Path, output_dir: Path, duration: Optional[float],
+                             has_audio: bool = False) -> Tuple[Optional[str], List[str], Optional[str]]:
+    """Generate frame thumbnails, plus a waveform when the video has audio,
+    with a single ffmpeg invocation.
+
+    Returns (main_thumbnail, frames, waveform) as index-relative paths.
+    """
     if not duration or duration <= 0:
-        return None, []
+        return None, [], None
 
     try:
         output_dir.mkdir(parents=True, exist_ok=True)
         base_name = file_path.stem
 
-        # Calculate timestamps for 5 frames
-        timestamps = [duration * i / (VIDEO_FRAME_COUNT + 1) for i in range(1, VIDEO_FRAME_COUNT + 1)]
+        # Frames land at duration * i / (count + 1) for i in 1..count, same
+        # spacing as before: seek to the first timestamp, then sample at that
+        # interval. One ffmpeg process emits all frames via the image2 pattern
+        # instead of paying seek + init cost per frame.
+        interval = duration / (VIDEO_FRAME_COUNT + 1)
+        waveform_path = output_dir / f"{base_name}_waveform.webp"
+
+        cmd = [
+            'ffmpeg', '-y', *hwaccel_args(), '-threads', '1',
+            '-ss', str(interval), '-i', str(file_path)
+        ]
+        if has_audio:
+            # Second (unseeked) read of the same container so the waveform
+            # covers the full track; still one process, one spawn
+            cmd += ['-i', str(file_path)]
+        cmd += [
+            '-vf', f'fps=1/{interval},scale={THUMBNAIL_WIDTH}:-1',
+            '-frames:v', str(VIDEO_FRAME_COUNT), '-start_number', '0',
+            '-q:v', '4',
+            str(output_dir / f"{base_name}_frame_%d.jpg")
+        ]
+        if has_audio:
+            cmd += [
+                '-filter_complex',
+                f'[1:a]showwavespic=s={THUMBNAIL_WIDTH}x400:colors=0x3b82f6[w]',
+                '-map', '[w]', '-frames:v', '1', str(waveform_path)
+            ]
+
+        run_media_subprocess(cmd, capture_output=True, timeout=120)
 
         frames = []
-        for idx, timestamp in enumerate(timestamps):
-            frame_path = output_dir / f"{base_name}_frame_{idx}.webp"
-
-            # Extract frame using ffmpeg
-            result = subprocess.run([
-                'ffmpeg', '-ss', str(timestamp), '-i', str(file_path),
-                '-vframes', '1', '-vf', f'scale={THUMBNAIL_WIDTH}:-1',
-                '-y', str(frame_path)
-            ], capture_output=True, timeout=30)
-
-            if result.returncode == 0 and frame_path.exists():
+        for idx in range(VIDEO_FRAME_COUNT):
+            frame_path = output_dir / f"{base_name}_frame_{idx}.jpg"
+            if frame_path.exists():
                 frames.append(str(frame_path.relative_to(OUTPUT_DIR / "public")))
 
         # Use middle frame as main thumbnail
         main_thumbnail = frames[len(frames) // 2] if frames else None
 
-        return main_thumbnail, frames
+        waveform = None
+        if has_audio and waveform_path.exists():
+            waveform = str(waveform_path.relative_to(OUTPUT_DIR / "public"))
+
+        return main_thumbnail, frames, waveform
 
     except Exception as e:
-        logging.error(f"Error generating video thumbnails for {file_path.name}: {e}")
-        return None, []
+        logging.error(f"Error generating video artifacts for {file_path.name}: {e}")
+        return None, [], None
 
 
 def generate_audio_waveform(file_path: Path, output_path: Path, duration: Optional[float]) -> bool:
@@ -270,8 +565,8 @@ def generate_audio_waveform(file_path: Path, output_path: Path, duration: Option
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Use ffmpeg to generate waveform
-        result = subprocess.run([
-            'ffmpeg', '-i', str(file_path),
+        result = run_media_subprocess([
+            'ffmpeg', '-threads', '1', '-i', str(file_path),
             '-filter_complex', f'showwavespic=s={THUMBNAIL_WIDTH}x400:colors=0x3b82f6',
             '-frames:v', '1', '-y', str(output_path)
         ], capture_output=True, timeout=30)
@@ -285,22 +580,29 @@ def generate_audio_waveform(file_path: Path, output_path: Path, duration: Option
     return False
 
 
-def process_file(file_path: Path, relative_path: Path) -> Optional[Dict]:
-    """Process a single media file and return its metadata."""
-    file_type = get_file_type(file_path)
+def process_file(file_path: Path, relative_path: Path,
+                 file_type: Optional[str] = None) -> Optional[Dict]:
+    """Process a single media file and return its metadata.
+
+    The file type is passed in when the caller already derived it during
+    the scan so it isn't looked up twice per file.
+    """
+    if file_type is None:
+        file_type = get_file_type(file_path)
     if not file_type:
         return None
 
     logging.info(f"Processing {file_type}: {relative_path}")
 
-    # Generate unique ID
-    file_id = hashlib.md5(str(relative_path).encode()).hexdigest()[:16]
+    # Warm the page cache before Pillow/ffmpeg read the file
+    advise_willneed(file_path)
 
-    # Get file size
-    file_size = file_path.stat().st_size
+    # Generate unique ID
+    file_id = hashlib.blake2b(str(relative_path).encode(), digest_size=8).hexdigest()
 
-    # Get creation date
-    creation_date = get_creation_date(file_path, file_type)
+    # Stat once: size here, birthtime/mtime fallback in get_creation_date
+    stat = file_path.stat()
+    file_size = stat.st_size
 
     # Get type-specific metadata
     if file_type == 'image':
@@ -310,10 +612,16 @@ def process_file(file_path: Path, relative_path: Path) -> Optional[Dict]:
     else:  # audio
         metadata = get_audio_metadata(file_path)
 
+    # Creation date: images carry it in their metadata (same open handle);
+    # videos/audio and EXIF-less images fall back to ffprobe/filesystem
+    creation_date = (metadata.pop('creationDate', None)
+                     or get_creation_date(file_path, file_type, stat))
+
     # Generate thumbnails
     thumbnail_dir = THUMBNAILS_DIR / relative_path.parent
     main_thumbnail = None
     frames = []
+    waveform = None
 
     if file_type == 'image':
         thumbnail_path = thumbnail_dir / f"{file_path.stem}.webp"
@@ -321,8 +629,10 @@ def process_file(file_path: Path, relative_path: Path) -> Optional[Dict]:
             main_thumbnail = str(thumbnail_path.relative_to(OUTPUT_DIR / "public"))
 
     elif file_type == 'video':
-        main_thumbnail, frames = generate_video_thumbnails(
-            file_path, thumbnail_dir, metadata['duration']
+        has_audio = any(s.get('codec_type') == 'audio'
+                        for s in probe_media(file_path).get('streams', []))
+        main_thumbnail, frames, waveform = generate_video_artifacts(
+            file_path, thumbnail_dir, metadata['duration'], has_audio
         )
 
     elif file_type == 'audio':
@@ -339,13 +649,15 @@ def process_file(file_path: Path, relative_path: Path) -> Optional[Dict]:
         'metadata': {
             'creationDate': creation_date,
             'fileSize': file_size,
+            'modifiedAt': stat.st_mtime,
             'resolution': metadata['resolution'],
             'duration': metadata['duration'],
             'format': metadata['format']
         },
         'thumbnails': {
             'main': main_thumbnail,
-            'frames': frames
+            'frames': frames,
+            'waveform': waveform
         },
         'googleDrive': {
             'url': '',
@@ -354,12 +666,82 @@ def process_file(file_path: Path, relative_path: Path) -> Optional[Dict]:
     }
 
 
+def _init_worker(thumbnails_dir: Path, output_dir: Path, semaphore):
+    """Initialize module-level paths and throttle in a pool worker process."""
+    global THUMBNAILS_DIR, OUTPUT_DIR, _SUBPROCESS_SEMAPHORE
+    THUMBNAILS_DIR = thumbnails_dir
+    OUTPUT_DIR = output_dir
+    _SUBPROCESS_SEMAPHORE = semaphore
+
+
+def _process_file_task(job: Tuple[str, str, str]) -> Optional[Dict]:
+    """Pool worker entry point: process one (path, relative path, type) job."""
+    file_path, relative_path, file_type = job
+    return process_file(Path(file_path), Path(relative_path), file_type)
+
+
+def process_files_parallel(jobs: Iterable[Tuple[Path, Path, str]]) -> Iterator[Dict]:
+    """Process media files concurrently across a pool of worker processes.
+
+    Each file is dispatched to a ProcessPoolExecutor so the subprocess/IO-heavy
+    work (ffmpeg, ffprobe, Pillow) runs on all cores. Submissions are bounded
+    so a huge volume doesn't queue every job in memory at once, and records
+    are yielded as workers complete them so the caller can stream them out.
+    """
+    max_pending = MAX_WORKERS * 4
+    done_count = 0
+
+    # Manager proxy so the cap is shared across workers even under spawn
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(
+        max_workers=MAX_WORKERS,
+        initializer=_init_worker,
+        initargs=(THUMBNAILS_DIR, OUTPUT_DIR, manager.BoundedSemaphore(MAX_WORKERS))
+    ) as executor:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending, done_count
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                try:
+                    file_data = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing file: {e}")
+                    continue
+                if file_data:
+                    done_count += 1
+                    # Progress update every 10 files
+                    if done_count % 10 == 0:
+                        logging.info(f"Progress: {done_count} files processed")
+                    yield file_data
+
+        for file_path, relative_path, file_type in jobs:
+            if len(pending) >= max_pending:
+                yield from drain(FIRST_COMPLETED)
+            pending.add(executor.submit(
+                _process_file_task, (str(file_path), str(relative_path), file_type)))
+
+        while pending:
+            yield from drain(FIRST_COMPLETED)
+
+
 def load_existing_index() -> Dict:
     """Load existing media index if it exists."""
     if OUTPUT_JSON.exists():
         try:
             with open(OUTPUT_JSON, 'r', encoding='utf-8') as f:
                 data = json.load(f)
+
+                # Ids are derived from relativePath; rehash on load so
+                # indexes written with the old md5 scheme compare cleanly
+                # against the current blake2b ids instead of appearing as
+                # missing + new duplicates
+                for file_entry in data.get('files', []):
+                    if file_entry.get('relativePath'):
+                        file_entry['id'] = hashlib.blake2b(
+                            file_entry['relativePath'].encode(), digest_size=8
+                        ).hexdigest()
+
                 logging.info(f"Loaded existing index with {len(data.get('files', []))} files")
                 return data
         except Exception as e:
@@ -376,18 +758,21 @@ def build_file_tree(volume_path: str) -> Dict[str, Dict]:
     file_tree = {}
     logging.info(f"Building file tree from {volume_path}...")
 
-    for file_path in volume.rglob('*'):
-        if file_path.is_file() and not should_skip_path(file_path):
-            if get_file_type(file_path):
-                relative_path = str(file_path.relative_to(volume))
-                file_id = hashlib.md5(relative_path.encode()).hexdigest()[:16]
-
-                file_tree[file_id] = {
-                    'path': file_path,
-                    'relativePath': relative_path,
-                    'mtime': file_path.stat().st_mtime,
-                    'size': file_path.stat().st_size
-                }
+    for entry in walk_parallel(volume):
+        file_path = Path(entry.path)
+        file_type = get_file_type(file_path)
+        if file_type:
+            relative_path = str(file_path.relative_to(volume))
+            file_id = hashlib.blake2b(relative_path.encode(), digest_size=8).hexdigest()
+
+            stat = entry.stat()
+            file_tree[file_id] = {
+                'path': file_path,
+                'relativePath': relative_path,
+                'type': file_type,
+                'mtime': stat.st_mtime,
+                'size': stat.st_size
+            }
 
     logging.info(f"Found {len(file_tree)} media files on disk")
     return file_tree
@@ -410,48 +795,61 @@ def delete_thumbnails(file_entry: Dict):
                 frame_path.unlink()
                 logging.debug(f"Deleted thumbnail: {frame_path}")
 
+        # Delete video waveform
+        if file_entry.get('thumbnails', {}).get('waveform'):
+            waveform_path = OUTPUT_DIR / "public" / file_entry['thumbnails']['waveform']
+            if waveform_path.exists():
+                waveform_path.unlink()
+                logging.debug(f"Deleted thumbnail: {waveform_path}")
+
     except Exception as e:
         logging.warning(f"Error deleting thumbnails for {file_entry.get('fileName')}: {e}")
 
 
-def scan_volume_full(volume_path: str) -> List[Dict]:
+def scan_volume_full(volume_path: str) -> Iterator[Dict]:
     """Scan volume for all media files (full scan, no incremental)."""
     volume = Path(volume_path)
     if not volume.exists():
         raise FileNotFoundError(f"Volume not found: {volume_path}")
 
-    files = []
+    logging.info(f"Starting full scan of {volume_path}...")
+
     total_files = 0
-    current_dir = None
 
-    logging.info(f"Starting full scan of {volume_path}...")
+    def iter_media_files():
+        nonlocal total_files
+        media_entries = []
 
-    for file_path in volume.rglob('*'):
-        # Log directory changes
-        if file_path.parent != current_dir:
-            current_dir = file_path.parent
-            logging.info(f"Scanning directory: {current_dir.relative_to(volume)}")
+        for entry in walk_parallel(volume):
+            file_type = get_file_type(Path(entry.path))
+            if file_type:
+                media_entries.append((entry.path, entry.inode(), file_type))
 
-        if file_path.is_file() and not should_skip_path(file_path):
-            if get_file_type(file_path):
-                total_files += 1
-                relative_path = file_path.relative_to(volume)
+        # Group by directory and inode so reads hit the medium sequentially;
+        # this matters on USB/SD where random access defeats readahead
+        media_entries.sort(key=lambda item: (os.path.dirname(item[0]), item[1]))
 
-                try:
-                    file_data = process_file(file_path, relative_path)
-                    if file_data:
-                        files.append(file_data)
-                        # Progress update every 10 files
-                        if len(files) % 10 == 0:
-                            logging.info(f"Progress: {len(files)} files processed")
-                except Exception as e:
-                    logging.error(f"Error processing {file_path}: {e}")
+        current_dir = None
+        for path_str, _, file_type in media_entries:
+            file_path = Path(path_str)
+
+            # Log directory changes
+            if file_path.parent != current_dir:
+                current_dir = file_path.parent
+                logging.info(f"Scanning directory: {current_dir.relative_to(volume)}")
+
+            total_files += 1
+            yield file_path, file_path.relative_to(volume), file_type
+
+    processed = 0
+    for file_data in process_files_parallel(iter_media_files()):
+        processed += 1
+        yield file_data
 
-    logging.info(f"Scan complete! Processed {len(files)} out of {total_files} media files")
-    return files
+    logging.info(f"Scan complete! Processed {processed} out of {total_files} media files")
 
 
-def scan_volume_incremental(volume_path: str, allow_delete: bool = True) -> List[Dict]:
+def scan_volume_incremental(volume_path: str, allow_delete: bool = True) -> Iterator[Dict]:
     """Incrementally scan volume, only processing new or changed files."""
     # Load existing index
     existing_index = load_existing_index()
@@ -472,12 +870,28 @@ def scan_volume_incremental(volume_path: str, allow_delete: bool = True) -> List
         if existing is None:
             # New file
             logging.info(f"NEW: {file_info['relativePath']}")
-            files_to_process.append((file_info['path'], Path(file_info['relativePath'])))
+            files_to_process.append(
+                (file_info['path'], Path(file_info['relativePath']), file_info['type']))
         elif existing['metadata']['fileSize'] != file_info['size']:
             # File size changed, re-process
             logging.info(f"CHANGED (size): {file_info['relativePath']}")
             delete_thumbnails(existing)
-            files_to_process.append((file_info['path'], Path(file_info['relativePath'])))
+            files_to_process.append(
+                (file_info['path'], Path(file_info['relativePath']), file_info['type']))
+        elif (existing['metadata'].get('modifiedAt') is not None
+                and existing['metadata']['modifiedAt'] != file_info['mtime']):
+            # Same size but modified since last scan (older indexes lack
+            # modifiedAt and fall back to the size check alone)
+            logging.info(f"CHANGED (mtime): {file_info['relativePath']}")
+            delete_thumbnails(existing)
+            files_to_process.append(
+                (file_info['path'], Path(file_info['relativePath']), file_info['type']))
+        elif (existing.get('thumbnails', {}).get('main')
+                and not (OUTPUT_DIR / "public" / existing['thumbnails']['main']).exists()):
+            # Thumbnail was deleted from disk, regenerate it
+            logging.info(f"MISSING THUMBNAIL: {file_info['relativePath']}")
+            files_to_process.append(
+                (file_info['path'], Path(file_info['relativePath']), file_info['type']))
         else:
             # File unchanged, keep existing entry
             files_to_keep.append(existing)
@@ -493,31 +907,23 @@ def scan_volume_incremental(volume_path: str, allow_delete: bool = True) -> List
                 logging.info(f"MISSING (kept in index): {existing['relativePath']}")
                 files_to_keep.append(existing)
 
-    # Process new/changed files
-    logging.info(f"\nProcessing {len(files_to_process)} new/changed files...")
-    processed_files = []
-
-    for idx, (file_path, relative_path) in enumerate(files_to_process, 1):
-        try:
-            file_data = process_file(file_path, relative_path)
-            if file_data:
-                processed_files.append(file_data)
+    # Stream kept entries first, then new/changed files as workers finish
+    yield from files_to_keep
 
-            if idx % 10 == 0:
-                logging.info(f"Progress: {idx}/{len(files_to_process)} files processed")
-        except Exception as e:
-            logging.error(f"Error processing {file_path}: {e}")
+    # Group work by directory for sequential reads off the medium
+    files_to_process.sort(key=lambda job: (os.path.dirname(str(job[0])), str(job[0])))
 
-    # Combine kept and newly processed files
-    all_files = files_to_keep + processed_files
+    logging.info(f"\nProcessing {len(files_to_process)} new/changed files...")
+    processed = 0
+    for file_data in process_files_parallel(files_to_process):
+        processed += 1
+        yield file_data
 
     logging.info(f"\nSummary:")
     logging.info(f"  - Kept unchanged: {len(files_to_keep)}")
-    logging.info(f"  - Newly processed: {len(processed_files)}")
+    logging.info(f"  - Newly processed: {processed}")
     logging.info(f"  - Deleted: {len(files_deleted)}")
-    logging.info(f"  - Total: {len(all_files)}")
-
-    return all_files
+    logging.info(f"  - Total: {len(files_to_keep) + processed}")
 
 
 def main():
@@ -558,34 +964,42 @@ def main():
             logging.info("Delete mode: ENABLED (missing files will be removed from index)")
         files = scan_volume_incremental(SOURCE_VOLUME, allow_delete=args.allow_delete)
 
-    # Calculate statistics
-    stats = {
-        'images': sum(1 for f in files if f['type'] == 'image'),
-        'videos': sum(1 for f in files if f['type'] == 'video'),
-        'audio': sum(1 for f in files if f['type'] == 'audio')
-    }
-
-    logging.info(f"Building JSON structure...")
+    # Stream records to disk as they arrive instead of holding the whole
+    # index in memory; metadata (which needs the final counts) goes last,
+    # and the finished file is moved into place atomically.
+    logging.info(f"Writing JSON to {OUTPUT_JSON}")
+    tmp_json = OUTPUT_JSON.with_suffix('.json.tmp')
+    type_keys = {'image': 'images', 'video': 'videos', 'audio': 'audio'}
+    stats = {'images': 0, 'videos': 0, 'audio': 0}
+    total_files = 0
 
-    # Build final JSON structure
-    output_data = {
-        'metadata': {
+    def dump_record(obj: Dict) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj)
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    with open(tmp_json, 'wb', buffering=1024 * 1024) as f:
+        f.write(b'{"files": [')
+        for file_data in files:
+            if total_files:
+                f.write(b',')
+            f.write(dump_record(file_data))
+            stats[type_keys[file_data['type']]] += 1
+            total_files += 1
+        f.write(b'], "metadata": ')
+        f.write(dump_record({
             'generatedAt': datetime.now().isoformat() + 'Z',
             'sourceVolume': SOURCE_VOLUME,
-            'totalFiles': len(files),
+            'totalFiles': total_files,
             'stats': stats
-        },
-        'files': files
-    }
+        }))
+        f.write(b'}')
 
-    # Write JSON file
-    logging.info(f"Writing JSON to {OUTPUT_JSON}")
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_json, OUTPUT_JSON)
 
     logging.info("=" * 60)
     logging.info(f"SUCCESS! Generated {OUTPUT_JSON}")
-    logging.info(f"Total files: {len(files)}")
+    logging.info(f"Total files: {total_files}")
     logging.info(f"  - Images: {stats['images']}")
     logging.info(f"  - Videos: {stats['videos']}")
     logging.info(f"  - Audio: {stats['audio']}")